@@ -3,13 +3,15 @@
  * Executes Python scripts for ML training and advanced inference
  */
 
-import { spawn } from 'child_process';
+import { spawn, ChildProcess } from 'child_process';
 import path from 'path';
 import { createModuleLogger } from '../../../../core/logger';
 import { IServiceResult, ILocalExplanation } from '../../domain';
 
 const logger = createModuleLogger('PythonBridge');
 
+const EXPLAIN_TIMEOUT_MS = 10000;
+
 export interface IPythonExecutionResult {
     stdout: string;
     stderr: string;
@@ -17,9 +19,17 @@ export interface IPythonExecutionResult {
     durationMs: number;
 }
 
+interface IPendingExplanation {
+    resolve: (result: IServiceResult<ILocalExplanation>) => void;
+    timeoutId: NodeJS.Timeout;
+}
+
 export class PythonBridgeService {
     private readonly pythonPath: string;
     private readonly scriptsDir: string;
+    private explainWorker: ChildProcess | null = null;
+    private explainBuffer = '';
+    private readonly pendingExplanations: IPendingExplanation[] = [];
 
     constructor() {
         // Use python from env or default to 'python'
@@ -140,48 +150,149 @@ export class PythonBridgeService {
 
         return this.executeScript(scriptName, args, { timeout: 30 * 60 * 1000 }); // 30 min timeout
     }
+    /**
+     * Generate an explanation via the persistent explain worker.
+     * One interpreter serves all requests over newline-delimited JSON, so
+     * interpreter boot, ONNX session construction, and the explainer
+     * caches are only paid once instead of per request.
+     */
     async generateExplanation(
         modelType: string,
         modelPath: string,
         inputData: Record<string, unknown>,
         backgroundDataPath?: string
     ): Promise<IServiceResult<ILocalExplanation>> {
-        const scriptName = 'explain_model.py';
+        const worker = this.ensureExplainWorker();
+        if (!worker || !worker.stdin) {
+            return { success: false, error: 'Failed to start explain worker' };
+        }
 
-        // Pass arguments as JSON string
-        const args = [
-            '--model_type', modelType,
-            '--model_path', modelPath,
-            '--input_data', JSON.stringify(inputData)
-        ];
+        const request = JSON.stringify({
+            modelType,
+            modelPath,
+            inputData,
+            ...(backgroundDataPath ? { backgroundData: backgroundDataPath } : {})
+        });
 
-        if (backgroundDataPath) {
-            args.push('--background_data', backgroundDataPath);
-        }
+        return new Promise((resolve) => {
+            const timeoutId = setTimeout(() => {
+                const idx = this.pendingExplanations.findIndex((p) => p.timeoutId === timeoutId);
+                if (idx !== -1) {
+                    this.pendingExplanations.splice(idx, 1);
+                }
+                // A late reply would desync the response queue, so restart
+                // the worker; the next request respawns it
+                logger.error('Explain worker timed out', { modelType, timeoutMs: EXPLAIN_TIMEOUT_MS });
+                worker.kill();
+                resolve({
+                    success: false,
+                    error: `Explanation timed out after ${EXPLAIN_TIMEOUT_MS}ms`
+                });
+            }, EXPLAIN_TIMEOUT_MS);
 
-        const result = await this.executeScript(scriptName, args, { timeout: 10000 }); // 10s timeout
+            this.pendingExplanations.push({ resolve, timeoutId });
+            worker.stdin?.write(request + '\n');
+        });
+    }
 
-        if (!result.success || !result.data) {
-            return { success: false, error: result.error || 'Explanation generation failed' };
+    /**
+     * Stop the persistent explain worker (e.g. on application shutdown)
+     */
+    dispose(): void {
+        if (this.explainWorker) {
+            this.explainWorker.kill();
+            this.explainWorker = null;
         }
+    }
 
-        try {
-            // Parse stdout JSON
-            // Stdout might contain logs, so we need to extract JSON
-            // Assuming script prints ONLY JSON or marked JSON
-            const output = result.data.stdout.trim();
-            // Simple heuristics: find last JSON object
-            const jsonStart = output.lastIndexOf('{');
-            const jsonEnd = output.lastIndexOf('}');
-            if (jsonStart === -1 || jsonEnd === -1) {
-                return { success: false, error: 'Invalid JSON output from explain script' };
+    /**
+     * Spawn the explain worker lazily and keep it across requests.
+     * The worker runs `explain_model.py --serve`: one JSON request per
+     * stdin line, one JSON reply per stdout line, strictly in order.
+     */
+    private ensureExplainWorker(): ChildProcess | null {
+        if (this.explainWorker && this.explainWorker.exitCode === null) {
+            return this.explainWorker;
+        }
+
+        const scriptPath = path.join(this.scriptsDir, 'explain_model.py');
+        logger.info('Starting explain worker', { script: scriptPath });
+
+        const worker = spawn(this.pythonPath, [scriptPath, '--serve'], {
+            cwd: this.scriptsDir,
+            env: process.env,
+            stdio: ['pipe', 'pipe', 'pipe']
+        });
+
+        worker.stdout?.on('data', (data) => this.onExplainWorkerData(data.toString()));
+        worker.stderr?.on('data', (data) => {
+            logger.info('Explain worker stderr', { output: data.toString().trim() });
+        });
+        worker.on('close', (code) => {
+            logger.error('Explain worker exited', { code });
+            this.explainWorker = null;
+            this.explainBuffer = '';
+            this.failPendingExplanations(`Explain worker exited with code ${code}`);
+        });
+        worker.on('error', (err) => {
+            logger.error('Failed to spawn explain worker', { error: err.message });
+            this.explainWorker = null;
+            this.explainBuffer = '';
+            this.failPendingExplanations(`Failed to spawn explain worker: ${err.message}`);
+        });
+
+        this.explainWorker = worker;
+        return worker;
+    }
+
+    /**
+     * Accumulate worker stdout and resolve one pending request per line.
+     * Replies arrive in request order, so the queue is strictly FIFO.
+     */
+    private onExplainWorkerData(chunk: string): void {
+        this.explainBuffer += chunk;
+
+        let newlineIdx = this.explainBuffer.indexOf('\n');
+        while (newlineIdx !== -1) {
+            const line = this.explainBuffer.substring(0, newlineIdx).trim();
+            this.explainBuffer = this.explainBuffer.substring(newlineIdx + 1);
+            newlineIdx = this.explainBuffer.indexOf('\n');
+
+            if (!line) continue;
+
+            // Protocol replies are always JSON objects. The worker redirects
+            // third-party stdout to stderr, but if a stray line slips through
+            // anyway, dropping it keeps the FIFO queue aligned instead of
+            // resolving the wrong request with it.
+            if (!line.startsWith('{')) {
+                logger.warn('Ignoring non-protocol line from explain worker', { line });
+                continue;
             }
 
-            const jsonStr = output.substring(jsonStart, jsonEnd + 1);
-            const explanation = JSON.parse(jsonStr) as ILocalExplanation;
-            return { success: true, data: explanation };
-        } catch (e) {
-            return { success: false, error: 'Failed to parse explanation output' };
+            const pending = this.pendingExplanations.shift();
+            if (!pending) continue; // reply for a request that already timed out
+
+            clearTimeout(pending.timeoutId);
+            try {
+                const parsed = JSON.parse(line) as ILocalExplanation & { error?: string };
+                if (parsed.error) {
+                    pending.resolve({ success: false, error: parsed.error });
+                } else {
+                    pending.resolve({ success: true, data: parsed });
+                }
+            } catch {
+                pending.resolve({ success: false, error: 'Failed to parse explanation output' });
+            }
+        }
+    }
+
+    private failPendingExplanations(error: string): void {
+        while (this.pendingExplanations.length > 0) {
+            const pending = this.pendingExplanations.shift();
+            if (pending) {
+                clearTimeout(pending.timeoutId);
+                pending.resolve({ success: false, error });
+            }
         }
     }
 }
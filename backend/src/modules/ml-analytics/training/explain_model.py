@@ -10,11 +10,21 @@ Output:
 """
 
 import argparse
+import contextlib
+import hashlib
 import json
 import sys
 import os
 import numpy as np
 
+# Optional orjson for faster request parse/serialize
+ORJSON_AVAILABLE = False
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    pass
+
 # Graceful fallback if SHAP not installed
 SHAP_AVAILABLE = False
 try:
@@ -30,89 +40,370 @@ try:
 except ImportError:
     pass
 
+# Optional GPU-accelerated KernelExplainer (cuML ports the coalition sampling
+# and weighted-regression solve to CUDA kernels)
+CUML_AVAILABLE = False
+try:
+    import cupy as cp
+    from cuml.explainer import KernelExplainer as CuKernelExplainer
+    CUML_AVAILABLE = True
+except ImportError:
+    pass
+
+
+TRT_ENGINE_CACHE_PATH = '/tmp/nestra_trt_cache'
+DEFAULT_SOCKET_PATH = '/tmp/nestra_explain.sock'
+
+
+def json_loads(data):
+    """Parse JSON with orjson when available"""
+    return orjson.loads(data) if ORJSON_AVAILABLE else json.loads(data)
+
+
+def json_dumps(obj) -> bytes:
+    """Serialize JSON to bytes with orjson when available"""
+    return orjson.dumps(obj) if ORJSON_AVAILABLE else json.dumps(obj).encode('utf-8')
+
+# Process-level caches so repeated requests (in --serve mode) skip ORT
+# session construction and KernelExplainer background precompute.
+# Explainer entries are keyed by (model_path, background digest) since the
+# coalition weights and expected value only depend on model + background.
+_session_cache: dict = {}
+_explainer_cache: dict = {}
+_expected_value_cache: dict = {}
+
+# Explainer/expected-value entries are only a handful per model in steady
+# state, but a long-lived serve worker must not grow them without bound
+_CACHE_MAX_ENTRIES = 8
+
+
+def _cache_put(cache: dict, key, value) -> None:
+    """Insert with FIFO eviction so long-lived workers stay bounded"""
+    if key not in cache:
+        while len(cache) >= _CACHE_MAX_ENTRIES:
+            cache.pop(next(iter(cache)))
+    cache[key] = value
 
-def load_onnx_model(model_path: str):
+
+def _explainer_cache_key(model_path: str, background_data: np.ndarray):
+    if model_path is None:
+        return None
+    digest = hashlib.blake2b(background_data.tobytes(), digest_size=16).digest()
+    return (model_path, digest)
+
+
+def _get_providers() -> list:
+    """Build execution provider list: TensorRT (cached FP16 engine) > CUDA > CPU"""
+    available = ort.get_available_providers()
+    providers = []
+    if 'TensorrtExecutionProvider' in available:
+        providers.append(('TensorrtExecutionProvider', {
+            'trt_fp16_enable': True,
+            'trt_engine_cache_enable': True,
+            'trt_engine_cache_path': TRT_ENGINE_CACHE_PATH
+        }))
+    if 'CUDAExecutionProvider' in available:
+        providers.append('CUDAExecutionProvider')
+    providers.append('CPUExecutionProvider')
+    return providers
+
+
+def load_onnx_model(model_path: str, allow_reduced_precision: bool = True):
     """Load ONNX model for inference"""
     if not ONNX_AVAILABLE:
         return None
-    session = ort.InferenceSession(model_path)
+
+    # Prefer exported siblings over the FP32 model: FP16 when a GPU
+    # provider will run it, INT8 for the CPU hot loop. The FP32 model
+    # stays on disk as the accuracy fallback; pass
+    # allow_reduced_precision=False to force it.
+    if allow_reduced_precision and not model_path.endswith(('.int8.onnx', '.fp16.onnx')):
+        gpu_available = any(
+            p in ort.get_available_providers()
+            for p in ('TensorrtExecutionProvider', 'CUDAExecutionProvider')
+        )
+        fp16_path = model_path.replace('.onnx', '.fp16.onnx')
+        int8_path = model_path.replace('.onnx', '.int8.onnx')
+        if gpu_available and os.path.exists(fp16_path):
+            model_path = fp16_path
+        elif os.path.exists(int8_path):
+            model_path = int8_path
+
+    sess_options = ort.SessionOptions()
+    sess_options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+
+    session = ort.InferenceSession(model_path, sess_options=sess_options, providers=_get_providers())
+
+    # Pre-warm: first run compiles/caches the TensorRT engine so the
+    # per-request path only sees cached-engine latency
+    model_input = session.get_inputs()[0]
+    input_size = model_input.shape[-1]
+    if isinstance(input_size, int):
+        dummy = np.zeros((1, input_size), dtype=np.float32)
+        session.run(None, {model_input.name: dummy})
+
     return session
 
 
+def get_onnx_session(model_path: str, allow_reduced_precision: bool = True):
+    """Get a cached ONNX session, loading it on first use"""
+    key = (model_path, allow_reduced_precision)
+    if key not in _session_cache:
+        _session_cache[key] = load_onnx_model(model_path, allow_reduced_precision)
+    return _session_cache[key]
+
+
 def create_prediction_function(session):
     """Create a prediction function wrapper for SHAP"""
     input_name = session.get_inputs()[0].name
     
     def predict(X):
+        # SHAP passes its full (n_coalitions, n_features) matrix here; the
+        # exported models have a dynamic batch axis, so run it as one batched
+        # call instead of per-row reshapes
         if len(X.shape) == 1:
             X = X.reshape(1, -1)
-        X = X.astype(np.float32)
+        X = np.ascontiguousarray(X, dtype=np.float32)
         result = session.run(None, {input_name: X})
         return result[0]
     
     return predict
 
 
-def generate_shap_explanation(session, input_data: dict, background_data: np.ndarray = None):
+BACKGROUND_RESERVOIR_MAX = 500
+
+# Centroids are rebuilt only after this many new reservoir rows. A stable
+# background between refreshes keeps the explainer-cache digest stable, so
+# repeated requests actually hit the cached KernelExplainer instead of
+# re-paying its setup on every call.
+BACKGROUND_REFRESH_ROWS = 25
+
+# model_type -> appends this process has made to the reservoir
+_reservoir_appends: dict = {}
+# model_type -> (appends at last kmeans build, centroids)
+_background_cache: dict = {}
+
+
+def _reservoir_path(model_type: str) -> str:
+    return os.path.join('/tmp', f'nestra_bg_{model_type}.npy')
+
+
+def update_background_reservoir(model_type: str, input_array: np.ndarray) -> None:
+    """Append the current input to the rolling reservoir of recent inputs"""
+    path = _reservoir_path(model_type)
+    try:
+        if os.path.exists(path):
+            reservoir = np.load(path)
+            reservoir = np.vstack([reservoir, input_array])[-BACKGROUND_RESERVOIR_MAX:]
+        else:
+            reservoir = input_array
+        np.save(path, reservoir.astype(np.float32))
+        _reservoir_appends[model_type] = _reservoir_appends.get(model_type, 0) + 1
+    except Exception as e:
+        print(f"Warning: Could not update background reservoir: {e}", file=sys.stderr)
+
+
+def build_background_data(model_type: str, n_features: int) -> np.ndarray:
+    """
+    Summarize the reservoir of recent inputs into 10 kmeans centroids.
+    A representative background keeps SHAP values meaningful at low
+    nsamples; zeros are only used on cold start. Centroids are reused
+    until BACKGROUND_REFRESH_ROWS new inputs have arrived.
+    """
+    appends = _reservoir_appends.get(model_type, 0)
+    cached = _background_cache.get(model_type)
+    if (cached is not None and cached[1].shape[1] == n_features
+            and appends - cached[0] < BACKGROUND_REFRESH_ROWS):
+        return cached[1]
+
+    path = _reservoir_path(model_type)
+    if os.path.exists(path):
+        try:
+            reservoir = np.load(path).astype(np.float32)
+            if reservoir.ndim == 2 and reservoir.shape[0] >= 10 and reservoir.shape[1] == n_features:
+                centroids = np.asarray(shap.kmeans(reservoir, 10).data, dtype=np.float32)
+                _background_cache[model_type] = (appends, centroids)
+                return centroids
+        except Exception as e:
+            print(f"Warning: Could not summarize background reservoir: {e}", file=sys.stderr)
+
+    # Cold start fallback
+    return np.zeros((10, n_features), dtype=np.float32)
+
+
+def _run_kernel_explainer(predict_fn, background_data: np.ndarray, input_array: np.ndarray,
+                          nsamples: int = 100, cache_key=None):
+    """Run KernelExplainer, preferring the CUDA implementation when available"""
+    explainer = _explainer_cache.get(cache_key) if cache_key is not None else None
+
+    if CUML_AVAILABLE and (explainer is None or isinstance(explainer, CuKernelExplainer)):
+        try:
+            if explainer is None:
+                explainer = CuKernelExplainer(
+                    model=predict_fn,
+                    data=cp.asarray(background_data),
+                    is_gpu_model=False
+                )
+                if cache_key is not None:
+                    _cache_put(_explainer_cache, cache_key, explainer)
+            shap_values = explainer.shap_values(cp.asarray(input_array))
+            return explainer, cp.asnumpy(shap_values)
+        except Exception as e:
+            print(f"cuML KernelExplainer failed, falling back to CPU SHAP: {e}", file=sys.stderr)
+            _explainer_cache.pop(cache_key, None)
+            explainer = None
+
+    if explainer is None:
+        explainer = shap.KernelExplainer(predict_fn, background_data)
+        if cache_key is not None:
+            _cache_put(_explainer_cache, cache_key, explainer)
+
+    shap_values = explainer.shap_values(input_array, nsamples=nsamples)
+    return explainer, shap_values
+
+
+def generate_shap_explanation(session, input_data: dict, background_data: np.ndarray = None,
+                              model_type: str = 'model', model_path: str = None):
     """Generate SHAP local explanation for a single prediction"""
-    
+
     # Convert input dict to numpy array (ordered by keys)
     feature_names = sorted(input_data.keys())
     input_array = np.array([[input_data[k] for k in feature_names]], dtype=np.float32)
-    
+
+    # Feed the reservoir so future requests get a representative background
+    update_background_reservoir(model_type, input_array)
+
     # Create background data if not provided
     if background_data is None:
-        # Use zeros as fallback background (not ideal but works)
-        background_data = np.zeros((10, len(feature_names)), dtype=np.float32)
+        background_data = build_background_data(model_type, len(feature_names))
+
+    # SHAP heuristic: enough coalitions for the feature count without
+    # paying for the flat nsamples=100 default
+    nsamples = 2 * len(feature_names) + 2048 // len(feature_names)
     
     # Create prediction function
     predict_fn = create_prediction_function(session)
     
-    # Create SHAP explainer
+    # Create SHAP explainer (GPU KernelExplainer when cuML is available,
+    # CPU shap.KernelExplainer otherwise)
+    cache_key = _explainer_cache_key(model_path, background_data)
     try:
-        # Try KernelExplainer (works with any model)
-        explainer = shap.KernelExplainer(predict_fn, background_data)
-        shap_values = explainer.shap_values(input_array, nsamples=100)
+        explainer, shap_values = _run_kernel_explainer(
+            predict_fn, background_data, input_array, nsamples, cache_key=cache_key
+        )
     except Exception as e:
         return None, str(e)
-    
-    # Get expected value (base value)
-    expected_value = float(explainer.expected_value) if hasattr(explainer.expected_value, '__float__') else float(explainer.expected_value[0])
-    
-    # Build explanation result
+
+    # Get expected value (base value); SHAP may hand back a scalar or an
+    # array of per-output values. It only depends on model + background,
+    # so cache it alongside the explainer.
+    expected_value = _expected_value_cache.get(cache_key)
+    if expected_value is None:
+        expected_value = float(np.ravel(explainer.expected_value)[0])
+        if cache_key is not None:
+            _cache_put(_expected_value_cache, cache_key, expected_value)
+
+    # Normalize SHAP output to a 1-D per-feature vector (first output for
+    # multi-output models)
     if isinstance(shap_values, list):
-        shap_values = shap_values[0]  # For single output
-    
-    shap_values_flat = shap_values.flatten().tolist()
-    
-    # Calculate feature importance (absolute mean)
-    feature_importance = {}
-    for i, name in enumerate(feature_names):
-        feature_importance[name] = abs(shap_values_flat[i])
-    
-    # Sort by importance
-    sorted_importance = sorted(feature_importance.items(), key=lambda x: x[1], reverse=True)
-    
+        shap_values = shap_values[0]
+    shap_values = np.asarray(shap_values)
+    if shap_values.ndim == 3:
+        shap_values = shap_values[0, :, 0]
+    else:
+        shap_values = shap_values.reshape(-1)[:len(feature_names)]
+
+    prediction = float(predict_fn(input_array).flatten()[0])
+    return _build_explanation_payload(feature_names, shap_values, expected_value, prediction, input_array), None
+
+
+def _build_explanation_payload(feature_names: list, values: np.ndarray, expected_value: float,
+                               prediction: float, input_array: np.ndarray) -> dict:
+    """Assemble the explanation dict from per-feature attribution values"""
+    # Single argsort pass drives both the importance ranking and the
+    # top-contributor slices
+    abs_values = np.abs(values)
+    order = np.argsort(-abs_values)
+    positive_idx = order[values[order] > 0][:5]
+    negative_idx = order[values[order] < 0][:5]
+
     return {
         "featureNames": feature_names,
-        "shapValues": shap_values_flat,
+        "shapValues": values.tolist(),
         "expectedValue": expected_value,
-        "prediction": float(predict_fn(input_array).flatten()[0]),
+        "prediction": prediction,
         "featureImportance": [
-            {"feature": name, "importance": importance, "value": float(input_data[name])}
-            for name, importance in sorted_importance
+            {"feature": feature_names[i], "importance": float(abs_values[i]), "value": float(input_array[0, i])}
+            for i in order
         ],
         "topContributors": {
             "positive": [
-                {"feature": feature_names[i], "contribution": shap_values_flat[i]}
-                for i in range(len(shap_values_flat)) if shap_values_flat[i] > 0
-            ][:5],
+                {"feature": feature_names[i], "contribution": float(values[i])}
+                for i in positive_idx
+            ],
             "negative": [
-                {"feature": feature_names[i], "contribution": shap_values_flat[i]}
-                for i in range(len(shap_values_flat)) if shap_values_flat[i] < 0
-            ][:5]
+                {"feature": feature_names[i], "contribution": float(values[i])}
+                for i in negative_idx
+            ]
         }
-    }, None
+    }
+
+
+def generate_ig_explanation(session, input_data: dict, background_data: np.ndarray = None,
+                            model_type: str = 'model'):
+    """
+    Integrated-gradients attribution computed directly on the ONNX session.
+
+    The models are small differentiable MLPs, so attribution along the
+    straight-line path from the background baseline to the input is far
+    cheaper than KernelExplainer's sampled coalitions plus per-explanation
+    regression solve. Gradients are approximated with central differences
+    and every perturbed point is evaluated in one batched session.run.
+    """
+    feature_names = sorted(input_data.keys())
+    input_array = np.array([[input_data[k] for k in feature_names]], dtype=np.float32)
+    n_features = len(feature_names)
+
+    # Feed the reservoir so future requests get a representative baseline
+    update_background_reservoir(model_type, input_array)
+
+    if background_data is None:
+        background_data = build_background_data(model_type, n_features)
+
+    predict_fn = create_prediction_function(session)
+
+    try:
+        baseline = background_data.mean(axis=0, keepdims=True).astype(np.float32)
+        steps = 16
+
+        # Midpoint rule over the interpolation path
+        alphas = ((np.arange(steps, dtype=np.float32) + 0.5) / steps).reshape(-1, 1)
+        path = baseline + alphas * (input_array - baseline)
+
+        # Per-feature finite-difference step scaled to feature magnitude
+        h = (np.abs(input_array) + np.abs(baseline)).ravel() * 5e-4 + 1e-6
+
+        plus = np.repeat(path, n_features, axis=0)
+        minus = plus.copy()
+        rows = np.arange(steps * n_features)
+        cols = np.tile(np.arange(n_features), steps)
+        plus[rows, cols] += h[cols]
+        minus[rows, cols] -= h[cols]
+
+        # One batched run: all perturbed points + input + baseline
+        batch = np.concatenate([plus, minus, input_array, baseline], axis=0)
+        preds = predict_fn(batch)[:, 0]
+
+        split = steps * n_features
+        grads = (preds[:split] - preds[split:2 * split]).reshape(steps, n_features) / (2 * h)
+        prediction = float(preds[-2])
+        expected_value = float(preds[-1])
+
+        attributions = (input_array - baseline).ravel() * grads.mean(axis=0)
+    except Exception as e:
+        return None, str(e)
+
+    return _build_explanation_payload(feature_names, attributions, expected_value, prediction, input_array), None
 
 
 def generate_mock_explanation(model_type: str, input_data: dict):
@@ -174,47 +465,158 @@ def load_background_data(path: str) -> np.ndarray:
         return None
 
 
+def handle_request(model_type: str, model_path: str, input_data: dict,
+                   background_path: str = None) -> dict:
+    """Generate one explanation, reusing cached sessions/explainers"""
+    result = None
+
+    if ONNX_AVAILABLE and os.path.exists(model_path):
+        # Load background data if provided
+        background = None
+        if background_path and os.path.exists(background_path):
+            background = load_background_data(background_path)
+
+        # Integrated gradients first: one batched inference pass instead
+        # of KernelExplainer's sampled coalitions. IG must run on the
+        # FP32 graph — its finite-difference step h ~ 5e-4*|x| sits far
+        # below the INT8 quantization step, so a quantized session rounds
+        # x+h and x-h into the same bucket and silently zeroes gradients.
+        fp32_session = get_onnx_session(model_path, allow_reduced_precision=False)
+        result, error = generate_ig_explanation(fp32_session, input_data, background, model_type)
+        if error:
+            print(f"Integrated gradients failed, trying SHAP: {error}", file=sys.stderr)
+            result = None
+
+        # SHAP fallback; sampled coalitions tolerate the reduced-precision
+        # siblings, so this path keeps the INT8/FP16 preference
+        if result is None and SHAP_AVAILABLE:
+            session = get_onnx_session(model_path)
+            result, error = generate_shap_explanation(session, input_data, background, model_type, model_path)
+            if error:
+                print(f"SHAP failed, using mock: {error}", file=sys.stderr)
+                result = None
+
+    # Fallback to mock
+    if result is None:
+        result = generate_mock_explanation(model_type, input_data)
+
+    # Add metadata
+    result["modelType"] = model_type
+    result["modelPath"] = model_path
+
+    return result
+
+
+def run_serve_loop() -> None:
+    """
+    Persistent worker mode: read newline-delimited JSON requests from stdin,
+    write one JSON result per line to stdout. Sessions and explainers stay
+    cached across requests, so only the first request per model pays setup.
+
+    Only protocol frames may reach the real stdout: third-party code can
+    print diagnostics with a bare print (SHAP does on bad inputs), and a
+    stray line would shift every later reply onto the wrong pending
+    request in the bridge. Request handling therefore runs with stdout
+    redirected to stderr, where the bridge logs it instead of parsing it.
+    """
+    out = sys.stdout
+    with contextlib.redirect_stdout(sys.stderr):
+        for line in sys.stdin:
+            line = line.strip()
+            if not line:
+                continue
+            result = _dispatch_request(line)
+            out.write(json_dumps(result).decode('utf-8') + '\n')
+            out.flush()
+
+
+def _dispatch_request(payload) -> dict:
+    """Parse one raw request payload and run it through handle_request"""
+    try:
+        request = json_loads(payload)
+        return handle_request(
+            request['modelType'],
+            request['modelPath'],
+            request['inputData'],
+            request.get('backgroundData')
+        )
+    except Exception as e:
+        return {"error": f"Explanation failed: {str(e)}"}
+
+
+def _recv_exact(conn, size: int):
+    """Receive exactly size bytes, or None if the peer closed the connection"""
+    buf = b''
+    while len(buf) < size:
+        chunk = conn.recv(size - len(buf))
+        if not chunk:
+            return None
+        buf += chunk
+    return buf
+
+
+def run_socket_server(socket_path: str) -> None:
+    """
+    Unix-domain-socket server mode: each request is a 4-byte big-endian
+    length prefix followed by a JSON payload, and the reply uses the same
+    framing. Avoids a fork-exec plus interpreter boot per request.
+    """
+    import socket
+
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(socket_path)
+    server.listen()
+    print(f"Explainer listening on {socket_path}", file=sys.stderr)
+
+    # Length-prefixed framing is immune to stray prints, but redirect
+    # them to stderr anyway so the worker's stdout stays clean for
+    # whichever process spawned it
+    with contextlib.redirect_stdout(sys.stderr):
+        while True:
+            conn, _ = server.accept()
+            with conn:
+                while True:
+                    header = _recv_exact(conn, 4)
+                    if header is None:
+                        break
+                    payload = _recv_exact(conn, int.from_bytes(header, 'big'))
+                    if payload is None:
+                        break
+                    reply = json_dumps(_dispatch_request(payload))
+                    conn.sendall(len(reply).to_bytes(4, 'big') + reply)
+
+
 def main():
     parser = argparse.ArgumentParser(description='SHAP Model Explainer')
-    parser.add_argument('--model_type', type=str, required=True, help='Model type')
-    parser.add_argument('--model_path', type=str, required=True, help='Path to ONNX model')
-    parser.add_argument('--input_data', type=str, required=True, help='JSON input features')
+    parser.add_argument('--model_type', type=str, help='Model type')
+    parser.add_argument('--model_path', type=str, help='Path to ONNX model')
+    parser.add_argument('--input_data', type=str, help='JSON input features')
     parser.add_argument('--background_data', type=str, help='Path to background data CSV')
-    
+    parser.add_argument('--serve', action='store_true',
+                        help='Run as a persistent worker reading JSON requests from stdin')
+    parser.add_argument('--socket', type=str, nargs='?', const=DEFAULT_SOCKET_PATH,
+                        help='With --serve: listen on a Unix domain socket instead of stdin')
+
     args = parser.parse_args()
-    
+
+    if args.serve:
+        if args.socket:
+            run_socket_server(args.socket)
+        else:
+            run_serve_loop()
+        return
+
+    if not (args.model_type and args.model_path and args.input_data):
+        parser.error('--model_type, --model_path and --input_data are required unless --serve is given')
+
     try:
-        # Parse input data
-        input_data = json.loads(args.input_data)
-        
-        result = None
-        
-        # Try SHAP if available and model exists
-        if SHAP_AVAILABLE and ONNX_AVAILABLE and os.path.exists(args.model_path):
-            session = load_onnx_model(args.model_path)
-            
-            # Load background data if provided
-            background = None
-            if args.background_data and os.path.exists(args.background_data):
-                background = load_background_data(args.background_data)
-            
-            # Generate SHAP explanation
-            result, error = generate_shap_explanation(session, input_data, background)
-            if error:
-                print(f"SHAP failed, using mock: {error}", file=sys.stderr)
-                result = None
-        
-        # Fallback to mock
-        if result is None:
-            result = generate_mock_explanation(args.model_type, input_data)
-        
-        # Add metadata
-        result["modelType"] = args.model_type
-        result["modelPath"] = args.model_path
-        
-        # Print JSON result
-        print(json.dumps(result))
-        
+        input_data = json_loads(args.input_data)
+        result = handle_request(args.model_type, args.model_path, input_data, args.background_data)
+        print(json_dumps(result).decode('utf-8'))
+
     except json.JSONDecodeError as e:
         print(json.dumps({"error": f"Invalid JSON input: {str(e)}"}))
         sys.exit(1)
@@ -11,8 +11,8 @@ from pathlib import Path
 import sys
 
 sys.path.append(str(Path(__file__).parent))
-from utils.data_loader import load_training_data, normalize_features
-from utils.trainer import ProductionTrainer
+from utils.data_loader import load_training_data, compute_norm_params, records_to_matrix
+from utils.trainer import ProductionTrainer, FastBatchNorm1d
 
 # ==================== MODEL DEFINITION ====================
 
@@ -27,12 +27,12 @@ class AlgorithmSelectorNN(nn.Module):
         self.network = nn.Sequential(
             nn.Linear(input_size, 64),
             nn.ReLU(),
-            nn.BatchNorm1d(64),
+            FastBatchNorm1d(64),
             nn.Dropout(0.3),
             
             nn.Linear(64, 32),
             nn.ReLU(),
-            nn.BatchNorm1d(32),
+            FastBatchNorm1d(32),
             nn.Dropout(0.2),
             
             nn.Linear(32, 16),
@@ -53,19 +53,19 @@ def generate_synthetic_data(n: int = 2000, seed: int = 42) -> tuple:
     """Generate realistic algorithm selection data using modern numpy.random.Generator"""
     rng = np.random.default_rng(seed)
     
-    features = np.zeros((n, 14), dtype=np.float32)
+    features = np.empty((n, 14), dtype=np.float32)  # every column is overwritten below
     
     # Piece characteristics
     features[:, 0] = rng.uniform(0, 1, n)  # pieceSizeVariance
     features[:, 1] = rng.uniform(0, 1, n)  # smallPieceRatio
     features[:, 2] = rng.uniform(0, 1, n)  # largePieceRatio
     features[:, 3] = rng.uniform(0, 1, n)  # squarePieceRatio
-    features[:, 4] = rng.integers(1, 50, n)  # uniqueShapeCount
+    features[:, 4] = rng.integers(1, 50, n, dtype=np.int32)  # uniqueShapeCount
     
     # Constraints
-    features[:, 5] = rng.integers(0, 2, n)  # rotationAllowed
+    features[:, 5] = rng.integers(0, 2, n, dtype=np.int32)  # rotationAllowed
     features[:, 6] = rng.uniform(0, 1, n)  # grainConstraintRatio
-    features[:, 7] = rng.integers(1, 10, n)  # stockVariety
+    features[:, 7] = rng.integers(1, 10, n, dtype=np.int32)  # stockVariety
     features[:, 8] = rng.uniform(0, 1, n)  # standardSizeRatio
     
     # Historical performance
@@ -74,23 +74,21 @@ def generate_synthetic_data(n: int = 2000, seed: int = 42) -> tuple:
     features[:, 11] = rng.uniform(8, 25, n)  # maxrectsHistoricalWaste
     
     # Counts
-    features[:, 12] = rng.integers(10, 500, n)  # totalPieceCount
-    features[:, 13] = rng.integers(1, 30, n)  # totalStockCount
-    
-    # Assign labels based on domain rules
-    labels = np.zeros(n, dtype=np.int64)
-    
-    for i in range(n):
-        if features[i, 0] > 0.7:
-            labels[i] = 2  # MAXRECTS for high variance
-        elif features[i, 6] > 0.5:
-            labels[i] = 1  # GUILLOTINE for grain constraints
-        elif features[i, 1] > 0.6:
-            labels[i] = 0  # BOTTOM_LEFT for small pieces
-        else:
-            hist_waste = [features[i, 9], features[i, 10], features[i, 11]]
-            labels[i] = int(np.argmin(hist_waste))
-    
+    features[:, 12] = rng.integers(10, 500, n, dtype=np.int32)  # totalPieceCount
+    features[:, 13] = rng.integers(1, 30, n, dtype=np.int32)  # totalStockCount
+    
+    # Assign labels based on domain rules (vectorized rule cascade)
+    hist_waste_labels = np.argmin(features[:, 9:12], axis=1)
+    labels = np.select(
+        [
+            features[:, 0] > 0.7,  # MAXRECTS for high variance
+            features[:, 6] > 0.5,  # GUILLOTINE for grain constraints
+            features[:, 1] > 0.6   # BOTTOM_LEFT for small pieces
+        ],
+        [2, 1, 0],
+        default=hist_waste_labels
+    ).astype(np.int64)
+
     return features, labels
 
 
@@ -119,8 +117,8 @@ def main() -> None:
             'maxrectsHistoricalWaste', 'totalPieceCount', 'totalStockCount'
         ]
         
-        features = np.array([[r.get(k, 0) for k in feature_keys] for r in raw_data], dtype=np.float32)
-        
+        features = records_to_matrix(raw_data, feature_keys)
+
         algo_map = {a: i for i, a in enumerate(ALGORITHMS)}
         labels = np.array([algo_map.get(r.get('bestAlgorithm', 'BOTTOM_LEFT'), 0) for r in raw_data], dtype=np.int64)
     else:
@@ -130,7 +128,8 @@ def main() -> None:
     print(f"📊 Dataset shape: X={features.shape}, y={labels.shape}")
     print(f"📊 Class distribution: {np.bincount(labels)}")
     
-    features_norm, norm_params = normalize_features(features)
+    # Normalization is applied in-place by the trainer on the target device
+    norm_params = compute_norm_params(features)
     
     model = AlgorithmSelectorNN(input_size=14)
     
@@ -142,10 +141,11 @@ def main() -> None:
         epochs=150,
         patience=20,
         seed=42,
-        verbose=True
+        verbose=True,
+        use_amp=True
     )
     
-    train_loader, val_loader = trainer.prepare_data(features_norm, labels.astype(np.float32), val_split=0.2)
+    train_loader, val_loader = trainer.prepare_data(features, labels.astype(np.float32), val_split=0.2, norm_params=norm_params)
     trainer.train(train_loader, val_loader, is_classification=True)
     
     output_path = str(models_dir / 'algorithm_selector.onnx')
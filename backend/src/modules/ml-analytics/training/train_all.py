@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Combined Training Driver
+Trains every model in a single Python process so torch/CUDA initialization
+and cuBLAS/cuDNN workspace setup are paid once instead of once per script
+"""
+
+import sys
+from pathlib import Path
+
+import torch
+
+sys.path.append(str(Path(__file__).parent))
+import train_waste_predictor
+import train_time_estimator
+import train_anomaly_predictor
+import train_algorithm_selector
+
+TRAINERS = [
+    ('waste_predictor', train_waste_predictor.main),
+    ('time_estimator', train_time_estimator.main),
+    ('anomaly_predictor', train_anomaly_predictor.main),
+    ('algorithm_selector', train_algorithm_selector.main),
+]
+
+
+def main() -> None:
+    print("=" * 60)
+    print("🚀 COMBINED TRAINING - All Models, One Process")
+    print("=" * 60)
+
+    if torch.cuda.is_available():
+        # Pay the CUDA context init up front, shared by every model
+        torch.cuda.init()
+
+    failures = []
+    for name, train_main in TRAINERS:
+        try:
+            train_main()
+        except Exception as e:
+            print(f"❌ {name} training failed: {e}", file=sys.stderr)
+            failures.append(name)
+
+    if failures:
+        print(f"\n❌ Training failed for: {', '.join(failures)}")
+        sys.exit(1)
+
+    print("\n✅ All models trained!")
+
+
+if __name__ == '__main__':
+    main()
@@ -11,9 +11,17 @@ from pathlib import Path
 import sys
 
 sys.path.append(str(Path(__file__).parent))
-from utils.data_loader import load_training_data, normalize_features
+from utils.data_loader import load_training_data, compute_norm_params, records_to_matrix
 from utils.trainer import ProductionTrainer
 
+# Optional Numba JIT for the per-row label rules
+NUMBA_AVAILABLE = False
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    pass
+
 # ==================== MODEL DEFINITION ====================
 
 class AnomalyPredictorNN(nn.Module):
@@ -25,16 +33,19 @@ class AnomalyPredictorNN(nn.Module):
     def __init__(self, input_size: int = 12):
         super().__init__()
         
-        # Shared feature extractor
+        # Shared feature extractor. LayerNorm instead of BatchNorm1d:
+        # this model scores single requests (batch 1) at inference, where
+        # per-sample normalization behaves identically in train and eval
+        # and avoids BN's running-stat bookkeeping
         self.shared = nn.Sequential(
             nn.Linear(input_size, 64),
             nn.ReLU(),
-            nn.BatchNorm1d(64),
+            nn.LayerNorm(64),
             nn.Dropout(0.2),
-            
+
             nn.Linear(64, 32),
             nn.ReLU(),
-            nn.BatchNorm1d(32)
+            nn.LayerNorm(32)
         )
         
         # Risk score head (regression 0-1)
@@ -64,11 +75,40 @@ class AnomalyPredictorNN(nn.Module):
 
 ANOMALY_TYPES = ['high_waste', 'slow_production', 'machine_issue', 'quality_problem']
 
+if NUMBA_AVAILABLE:
+    @njit(parallel=True, cache=True)
+    def _label_kernel(features, labels):  # pragma: no cover - compiled
+        """Row-parallel label rules; rows are independent so prange is safe"""
+        for i in prange(features.shape[0]):
+            risk = 0.0
+
+            if features[i, 3] > 1.5:
+                labels[i, 1] = min(0.9, features[i, 3] / 3)
+                risk += 0.3
+
+            if features[i, 4] > 1.0:
+                labels[i, 2] = min(0.9, features[i, 4] / 2)
+                risk += 0.25
+
+            if features[i, 5] < -1.0:
+                labels[i, 3] = min(0.9, abs(features[i, 5]) / 2)
+                risk += 0.25
+
+            if features[i, 6] >= 3:
+                risk += 0.15
+                labels[i, 4] = 0.3
+
+            if features[i, 11] == 1 or features[i, 10] > 20 or features[i, 10] < 7:
+                risk += 0.05
+
+            labels[i, 0] = min(1.0, risk)
+
+
 def generate_synthetic_data(n: int = 2000, seed: int = 42) -> tuple:
     """Generate realistic anomaly detection data using modern numpy.random.Generator"""
     rng = np.random.default_rng(seed)
     
-    features = np.zeros((n, 12), dtype=np.float32)
+    features = np.empty((n, 12), dtype=np.float32)  # every column is overwritten below
     
     # Current metrics
     features[:, 0] = rng.uniform(5, 35, n)  # currentWaste
@@ -81,42 +121,41 @@ def generate_synthetic_data(n: int = 2000, seed: int = 42) -> tuple:
     features[:, 5] = rng.uniform(-1.5, 1, n)  # efficiencyDeviation
     
     # Context
-    features[:, 6] = rng.integers(0, 5, n)  # recentAnomalyCount
+    features[:, 6] = rng.integers(0, 5, n, dtype=np.int32)  # recentAnomalyCount
     features[:, 7] = rng.uniform(10, 20, n)  # avgHistoricalWaste
     features[:, 8] = rng.uniform(40, 80, n)  # avgHistoricalTime
     
     # Time features
-    features[:, 9] = rng.integers(0, 7, n)  # dayOfWeek
-    features[:, 10] = rng.integers(6, 22, n)  # hourOfDay
+    features[:, 9] = rng.integers(0, 7, n, dtype=np.int32)  # dayOfWeek
+    features[:, 10] = rng.integers(6, 22, n, dtype=np.int32)  # hourOfDay
     features[:, 11] = (features[:, 9] >= 5).astype(np.float32)  # isWeekend
     
     # Generate labels: [Risk, HighWaste, SlowProd, MachineIssue, Quality]
     labels = np.zeros((n, 5), dtype=np.float32)
-    
-    for i in range(n):
-        risk = 0.0
-        
-        if features[i, 3] > 1.5:
-            labels[i, 1] = min(0.9, features[i, 3] / 3)
-            risk += 0.3
-        
-        if features[i, 4] > 1.0:
-            labels[i, 2] = min(0.9, features[i, 4] / 2)
-            risk += 0.25
-        
-        if features[i, 5] < -1.0:
-            labels[i, 3] = min(0.9, abs(features[i, 5]) / 2)
-            risk += 0.25
-        
-        if features[i, 6] >= 3:
-            risk += 0.15
-            labels[i, 4] = 0.3
-        
-        if features[i, 11] == 1 or features[i, 10] > 20 or features[i, 10] < 7:
-            risk += 0.05
-        
-        labels[i, 0] = min(1.0, risk)
-    
+
+    if NUMBA_AVAILABLE:
+        _label_kernel(features, labels)
+        return features, labels
+
+    # Fallback: each rule as a boolean mask over all rows
+    high_waste = features[:, 3] > 1.5
+    labels[high_waste, 1] = np.minimum(0.9, features[high_waste, 3] / 3)
+
+    slow_prod = features[:, 4] > 1.0
+    labels[slow_prod, 2] = np.minimum(0.9, features[slow_prod, 4] / 2)
+
+    machine_issue = features[:, 5] < -1.0
+    labels[machine_issue, 3] = np.minimum(0.9, np.abs(features[machine_issue, 5]) / 2)
+
+    frequent_anomalies = features[:, 6] >= 3
+    labels[frequent_anomalies, 4] = 0.3
+
+    off_hours = (features[:, 11] == 1) | (features[:, 10] > 20) | (features[:, 10] < 7)
+
+    risk = (0.3 * high_waste + 0.25 * slow_prod + 0.25 * machine_issue +
+            0.15 * frequent_anomalies + 0.05 * off_hours)
+    labels[:, 0] = np.minimum(1.0, risk)
+
     return features, labels
 
 
@@ -144,32 +183,23 @@ def main() -> None:
             'avgHistoricalWaste', 'avgHistoricalTime', 'dayOfWeek', 'hourOfDay', 'isWeekend'
         ]
         
-        features = np.array([[r.get(k, 0) for k in feature_keys] for r in raw_data], dtype=np.float32)
-        
-        labels_list = []
-        for r in raw_data:
-            label_vec = [0.0] * 5
-            had_anomaly = r.get('hadAnomaly', 0)
-            atype = r.get('anomalyType')
-            
-            if had_anomaly:
-                label_vec[0] = 0.8
-                if atype == 'high_waste': label_vec[1] = 1.0
-                elif atype == 'slow_production': label_vec[2] = 1.0
-                elif atype == 'machine_issue': label_vec[3] = 1.0
-            else:
-                label_vec[0] = 0.1
-                
-            labels_list.append(label_vec)
-        
-        labels = np.array(labels_list, dtype=np.float32)
+        features = records_to_matrix(raw_data, feature_keys)
+
+        had_anomaly = records_to_matrix(raw_data, ['hadAnomaly'])[:, 0] > 0
+        anomaly_types = np.array([r.get('anomalyType') or '' for r in raw_data])
+
+        labels = np.zeros((len(raw_data), 5), dtype=np.float32)
+        labels[:, 0] = np.where(had_anomaly, 0.8, 0.1)
+        for col, atype in enumerate(ANOMALY_TYPES[:3], start=1):
+            labels[had_anomaly & (anomaly_types == atype), col] = 1.0
     else:
         print("⚠️  Insufficient real data, using synthetic data")
         features, labels = generate_synthetic_data(2000)
     
     print(f"📊 Dataset shape: X={features.shape}, y={labels.shape}")
     
-    features_norm, norm_params = normalize_features(features)
+    # Normalization is applied in-place by the trainer on the target device
+    norm_params = compute_norm_params(features)
     
     model = AnomalyPredictorNN(input_size=12)
     
@@ -181,10 +211,11 @@ def main() -> None:
         epochs=150,
         patience=20,
         seed=42,
-        verbose=True
+        verbose=True,
+        use_amp=True
     )
     
-    train_loader, val_loader = trainer.prepare_data(features_norm, labels, val_split=0.2)
+    train_loader, val_loader = trainer.prepare_data(features, labels, val_split=0.2, norm_params=norm_params)
     trainer.train(train_loader, val_loader, is_classification=False)
     
     output_path = str(models_dir / 'anomaly_predictor.onnx')
@@ -11,8 +11,8 @@ from pathlib import Path
 import sys
 
 sys.path.append(str(Path(__file__).parent))
-from utils.data_loader import load_training_data, normalize_features
-from utils.trainer import ProductionTrainer
+from utils.data_loader import load_training_data, compute_norm_params, records_to_matrix
+from utils.trainer import ProductionTrainer, FastBatchNorm1d
 
 # ==================== MODEL DEFINITION ====================
 
@@ -27,12 +27,12 @@ class TimeEstimatorNN(nn.Module):
         self.network = nn.Sequential(
             nn.Linear(input_size, 64),
             nn.LeakyReLU(0.1),
-            nn.BatchNorm1d(64),
+            FastBatchNorm1d(64),
             nn.Dropout(0.2),
             
             nn.Linear(64, 32),
             nn.LeakyReLU(0.1),
-            nn.BatchNorm1d(32),
+            FastBatchNorm1d(32),
             
             nn.Linear(32, 16),
             nn.ReLU(),
@@ -51,20 +51,20 @@ def generate_synthetic_data(n: int = 2000, seed: int = 42) -> tuple:
     """Generate realistic time estimation data using modern numpy.random.Generator"""
     rng = np.random.default_rng(seed)
     
-    features = np.zeros((n, 12), dtype=np.float32)
+    features = np.empty((n, 12), dtype=np.float32)  # every column is overwritten below
     
     # Core features
-    features[:, 0] = rng.integers(10, 500, n)  # totalPieces
+    features[:, 0] = rng.integers(10, 500, n, dtype=np.int32)  # totalPieces
     features[:, 1] = features[:, 0] * rng.uniform(2, 6, n)  # totalCuts
     features[:, 2] = rng.uniform(5, 30, n)  # wastePercentage
-    features[:, 3] = rng.integers(1, 30, n)  # stockUsedCount
+    features[:, 3] = rng.integers(1, 30, n, dtype=np.int32)  # stockUsedCount
     
     # Machine info
-    features[:, 4] = rng.integers(0, 3, n)  # machineType
+    features[:, 4] = rng.integers(0, 3, n, dtype=np.int32)  # machineType
     features[:, 5] = rng.uniform(0.5, 2.0, n)  # machineSpeed
     
     # Material
-    features[:, 6] = rng.integers(0, 10, n)  # materialTypeIndex
+    features[:, 6] = rng.integers(0, 10, n, dtype=np.int32)  # materialTypeIndex
     features[:, 7] = rng.uniform(1, 25, n)  # thickness
     
     # Piece info
@@ -112,15 +112,16 @@ def main() -> None:
             'maxPieceArea', 'operatorAvgTime', 'machineAvgTime'
         ]
         
-        features = np.array([[r.get(k, 0) for k in feature_keys] for r in raw_data], dtype=np.float32)
-        labels = np.array([min(r.get('actualTimeMinutes', 0) / 180.0, 1.0) for r in raw_data], dtype=np.float32)
+        features = records_to_matrix(raw_data, feature_keys)
+        labels = np.minimum(records_to_matrix(raw_data, ['actualTimeMinutes'])[:, 0] / 180.0, 1.0)
     else:
         print("⚠️  Insufficient real data, using synthetic data")
         features, labels = generate_synthetic_data(2000)
     
     print(f"📊 Dataset shape: X={features.shape}, y={labels.shape}")
     
-    features_norm, norm_params = normalize_features(features)
+    # Normalization is applied in-place by the trainer on the target device
+    norm_params = compute_norm_params(features)
     
     model = TimeEstimatorNN(input_size=12)
     
@@ -132,10 +133,11 @@ def main() -> None:
         epochs=150,
         patience=20,
         seed=42,
-        verbose=True
+        verbose=True,
+        use_amp=True
     )
     
-    train_loader, val_loader = trainer.prepare_data(features_norm, labels, val_split=0.2)
+    train_loader, val_loader = trainer.prepare_data(features, labels, val_split=0.2, norm_params=norm_params)
     trainer.train(train_loader, val_loader, is_classification=False)
     
     output_path = str(models_dir / 'time_estimator.onnx')
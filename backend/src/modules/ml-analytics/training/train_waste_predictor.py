@@ -12,7 +12,7 @@ import sys
 
 # Add parent to path for imports
 sys.path.append(str(Path(__file__).parent))
-from utils.data_loader import load_training_data, normalize_features
+from utils.data_loader import load_training_data, compute_norm_params, records_to_matrix
 from utils.trainer import ProductionTrainer
 
 # ==================== MODEL DEFINITION ====================
@@ -20,28 +20,32 @@ from utils.trainer import ProductionTrainer
 class WastePredictorNN(nn.Module):
     """
     Neural network for waste percentage prediction
-    Architecture: MLP with BatchNorm and Dropout for tabular regression
+    Architecture: MLP with LayerNorm and Dropout for tabular regression.
+    LayerNorm over BatchNorm1d: at batch 32 with 128/64/32-wide layers
+    BN1d's tiny cross-batch reductions are a known slow path, while
+    LayerNorm hits a fused kernel, needs no running stats, and behaves
+    the same at batch 1 inference
     """
-    
+
     def __init__(self, input_size: int = 19):
         super().__init__()
         self.network = nn.Sequential(
             # Input layer
             nn.Linear(input_size, 128),
             nn.LeakyReLU(0.1),
-            nn.BatchNorm1d(128),
+            nn.LayerNorm(128),
             nn.Dropout(0.3),
-            
+
             # Hidden layer 1
             nn.Linear(128, 64),
             nn.LeakyReLU(0.1),
-            nn.BatchNorm1d(64),
+            nn.LayerNorm(64),
             nn.Dropout(0.2),
-            
+
             # Hidden layer 2
             nn.Linear(64, 32),
             nn.LeakyReLU(0.1),
-            nn.BatchNorm1d(32),
+            nn.LayerNorm(32),
             
             # Hidden layer 3
             nn.Linear(32, 16),
@@ -62,60 +66,80 @@ def generate_synthetic_data(n: int = 2000, seed: int = 42) -> tuple:
     """
     Generate realistic synthetic data for training
     Uses modern numpy.random.Generator API (SonarQube S6711 compliant)
+
+    The dataset is deterministic in (n, seed), so it is cached to /tmp
+    and memory-mapped on repeat runs instead of being regenerated
     """
+    cache_stem = f'/tmp/nestra_waste_synth_n{n}_s{seed}'
+    try:
+        features = np.load(f'{cache_stem}_x.npy', mmap_mode='r')
+        waste = np.load(f'{cache_stem}_y.npy', mmap_mode='r')
+        return features, waste
+    except (OSError, ValueError):
+        pass  # cache miss or unreadable cache: regenerate below
+
     rng = np.random.default_rng(seed)
-    
+
     # Generate correlated features that mimic real cutting scenarios
-    features = np.zeros((n, 19), dtype=np.float32)
-    
+    features = np.empty((n, 19), dtype=np.float32)  # every column is overwritten below
+
+    # One bulk float32 draw amortizes RNG call overhead; each column is
+    # an affine rescale of its row (lo + (hi - lo) * u)
+    u = rng.random((13, n), dtype=np.float32)
+    ints = rng.integers([[10], [1], [0], [0]], [[500], [50], [2], [10]],
+                        (4, n), dtype=np.int32)
+
     # Piece counts (correlated)
-    features[:, 0] = rng.integers(10, 500, n)  # totalPieceCount
-    features[:, 1] = np.clip(features[:, 0] * rng.uniform(0.1, 0.5, n), 1, 100)  # uniquePieceCount
-    
+    features[:, 0] = ints[0]  # totalPieceCount
+    features[:, 1] = np.clip(features[:, 0] * (0.1 + 0.4 * u[0]), 1, 100)  # uniquePieceCount
+
     # Piece areas
-    features[:, 2] = rng.uniform(1000, 50000, n)  # avgPieceArea
-    features[:, 3] = features[:, 2] * rng.uniform(0.1, 0.5, n)  # pieceAreaStdDev
-    features[:, 4] = features[:, 2] * rng.uniform(0.2, 0.8, n)  # minPieceArea
-    features[:, 5] = features[:, 2] * rng.uniform(1.2, 3.0, n)  # maxPieceArea
-    
+    features[:, 2] = 1000 + 49000 * u[1]  # avgPieceArea
+    features[:, 3] = features[:, 2] * (0.1 + 0.4 * u[2])  # pieceAreaStdDev
+    features[:, 4] = features[:, 2] * (0.2 + 0.6 * u[3])  # minPieceArea
+    features[:, 5] = features[:, 2] * (1.2 + 1.8 * u[4])  # maxPieceArea
+
     # Aspect ratios
-    features[:, 6] = rng.uniform(1.0, 4.0, n)  # pieceAspectRatioMean
-    features[:, 7] = rng.uniform(0.1, 1.0, n)  # pieceAspectRatioStdDev
-    
+    features[:, 6] = 1.0 + 3.0 * u[5]  # pieceAspectRatioMean
+    features[:, 7] = 0.1 + 0.9 * u[6]  # pieceAspectRatioStdDev
+
     # Stock info
-    features[:, 8] = rng.uniform(1e6, 1e8, n)  # totalStockArea
-    features[:, 9] = rng.integers(1, 50, n)  # stockSheetCount
+    features[:, 8] = 1e6 + (1e8 - 1e6) * u[7]  # totalStockArea
+    features[:, 9] = ints[1]  # stockSheetCount
     features[:, 10] = features[:, 8] / features[:, 9]  # avgStockArea
-    features[:, 11] = rng.uniform(1.5, 2.5, n)  # stockAspectRatio
-    
+    features[:, 11] = 1.5 + 1.0 * u[8]  # stockAspectRatio
+
     # Ratios
-    features[:, 12] = rng.uniform(0.3, 0.95, n)  # totalDemandToStockRatio
-    features[:, 13] = rng.uniform(0.01, 0.3, n)  # pieceToStockSizeRatio
-    
+    features[:, 12] = 0.3 + 0.65 * u[9]  # totalDemandToStockRatio
+    features[:, 13] = 0.01 + 0.29 * u[10]  # pieceToStockSizeRatio
+
     # Parameters
-    features[:, 14] = rng.uniform(1, 5, n)  # kerf
-    features[:, 15] = rng.integers(0, 2, n)  # allowRotation
-    features[:, 16] = rng.integers(0, 10, n)  # materialTypeIndex
-    
+    features[:, 14] = 1 + 4 * u[11]  # kerf
+    features[:, 15] = ints[2]  # allowRotation
+    features[:, 16] = ints[3]  # materialTypeIndex
+
     # Historical
-    features[:, 17] = rng.uniform(5, 25, n)  # historicalAvgWaste
-    features[:, 18] = features[:, 17] * rng.uniform(0.8, 1.2, n)  # lastJobWaste
-    
-    # Generate labels based on realistic waste model
-    base_waste = 0.10
-    demand_factor = -0.15 * (features[:, 12] - 0.5)
-    variety_factor = 0.05 * (features[:, 1] / features[:, 0])
-    aspect_factor = 0.03 * features[:, 7]
-    kerf_factor = 0.01 * features[:, 14]
-    rotation_factor = -0.02 * features[:, 15]
-    historical_factor = 0.3 * (features[:, 17] / 100)
-    
-    waste = (base_waste + demand_factor + variety_factor + 
-             aspect_factor + kerf_factor + rotation_factor + 
-             historical_factor + rng.normal(0, 0.02, n))
-    
-    waste = np.clip(waste, 0.02, 0.50).astype(np.float32)
-    
+    features[:, 17] = 5 + 20 * u[12]  # historicalAvgWaste
+    features[:, 18] = features[:, 17] * (0.8 + 0.4 * rng.random(n, dtype=np.float32))  # lastJobWaste
+
+    # Waste model accumulated in-place into the noise buffer instead of
+    # one large chained expression full of temporaries
+    waste = rng.normal(0, 0.02, n).astype(np.float32)
+    waste += 0.10  # base waste
+    waste -= 0.15 * (features[:, 12] - 0.5)  # demand factor
+    waste += 0.05 * (features[:, 1] / features[:, 0])  # variety factor
+    waste += 0.03 * features[:, 7]  # aspect factor
+    waste += 0.01 * features[:, 14]  # kerf factor
+    waste -= 0.02 * features[:, 15]  # rotation factor
+    waste += 0.003 * features[:, 17]  # historical factor
+    np.clip(waste, 0.02, 0.50, out=waste)
+
+    try:
+        np.save(f'{cache_stem}_x.npy', features)
+        np.save(f'{cache_stem}_y.npy', waste)
+    except OSError:
+        pass  # read-only /tmp just means no cache for next time
+
     return features, waste
 
 
@@ -147,8 +171,8 @@ def main() -> None:
             'materialTypeIndex', 'historicalAvgWaste', 'lastJobWaste'
         ]
         
-        features = np.array([[r.get(k, 0) for k in feature_keys] for r in raw_data], dtype=np.float32)
-        labels = np.array([r.get('actualWastePercent', 0) / 100.0 for r in raw_data], dtype=np.float32)
+        features = records_to_matrix(raw_data, feature_keys)
+        labels = records_to_matrix(raw_data, ['actualWastePercent'])[:, 0] / 100.0
     else:
         print("⚠️  Insufficient real data, using synthetic data")
         features, labels = generate_synthetic_data(2000)
@@ -156,7 +180,8 @@ def main() -> None:
     print(f"📊 Dataset shape: X={features.shape}, y={labels.shape}")
     
     # Normalize features
-    features_norm, norm_params = normalize_features(features)
+    # Normalization is applied in-place by the trainer on the target device
+    norm_params = compute_norm_params(features)
     
     # Create model and trainer
     model = WastePredictorNN(input_size=19)
@@ -169,11 +194,12 @@ def main() -> None:
         epochs=150,
         patience=20,
         seed=42,
-        verbose=True
+        verbose=True,
+        use_amp=True
     )
     
     # Prepare data loaders
-    train_loader, val_loader = trainer.prepare_data(features_norm, labels, val_split=0.2)
+    train_loader, val_loader = trainer.prepare_data(features, labels, val_split=0.2, norm_params=norm_params)
     
     # Train
     trainer.train(train_loader, val_loader, is_classification=False)
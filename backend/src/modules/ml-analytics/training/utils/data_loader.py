@@ -19,19 +19,42 @@ def load_training_data(file_path: str) -> List[Dict[str, Any]]:
     with open(path, 'r') as f:
         return json.load(f)
 
-def normalize_features(features: np.ndarray) -> Tuple[np.ndarray, Dict[str, List[float]]]:
+def records_to_matrix(raw_data: List[Dict[str, Any]], feature_keys: List[str]) -> np.ndarray:
     """
-    Z-score normalization
-    Returns: (normalized_features, params)
+    Convert raw JSON records to a float32 feature matrix
+    Uses pandas' C-level column extraction when available instead of
+    a nested Python list comprehension over records x keys
+    """
+    try:
+        import pandas as pd
+        return (pd.DataFrame(raw_data)
+                .reindex(columns=feature_keys)
+                .fillna(0)
+                .to_numpy(dtype=np.float32))
+    except ImportError:
+        return np.array([[r.get(k, 0) for k in feature_keys] for r in raw_data], dtype=np.float32)
+
+def compute_norm_params(features: np.ndarray) -> Dict[str, List[float]]:
+    """
+    Compute z-score normalization parameters without applying them.
+    The trainer applies them in-place on the training device, so raw
+    features never need an extra normalized copy in host memory
     """
     means = features.mean(axis=0).tolist()
     stds = features.std(axis=0).tolist()
     # Avoid division by zero
     stds = [s if s > 1e-6 else 1.0 for s in stds]
-    
-    normalized = (features - np.array(means)) / np.array(stds)
-    
-    return normalized, {'means': means, 'stds': stds}
+    return {'means': means, 'stds': stds}
+
+def normalize_features(features: np.ndarray) -> Tuple[np.ndarray, Dict[str, List[float]]]:
+    """
+    Z-score normalization applied in-place (float32, single pass)
+    Returns: (normalized_features, params)
+    """
+    params = compute_norm_params(features)
+    features -= np.asarray(params['means'], dtype=np.float32)
+    features /= np.asarray(params['stds'], dtype=np.float32)
+    return features, params
 
 def save_metadata(output_path: str, model_type: str, norm_params: Dict, input_size: int):
     """Save model metadata including normalization parameters"""
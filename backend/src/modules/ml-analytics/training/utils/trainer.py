@@ -9,11 +9,19 @@ import torch.optim as optim
 from torch.utils.data import DataLoader, TensorDataset
 from torch.optim.lr_scheduler import ReduceLROnPlateau
 import numpy as np
-from typing import Optional, Tuple
+from typing import Iterable, Optional, Tuple
+import copy
 import json
 from datetime import datetime
 import os
 
+# Allow TF32 matmuls on Ampere+ GPUs even outside autocast regions
+torch.set_float32_matmul_precision('high')
+
+# Datasets up to this size are preloaded whole onto the GPU; beyond it
+# the DataLoader path streams batches through pinned memory instead
+_PRELOAD_BYTES_LIMIT = 256 * 1024 * 1024
+
 
 def get_num_workers() -> int:
     """Get optimal number of workers for DataLoader"""
@@ -24,6 +32,157 @@ def get_num_workers() -> int:
     return min(4, cpu_count) if cpu_count else 0
 
 
+def as_float_tensor(arr: np.ndarray) -> torch.Tensor:
+    """
+    Zero-copy float32 tensor view of a NumPy array. The legacy
+    torch.FloatTensor(arr) constructor always copies; from_numpy shares
+    the buffer. A copy only happens when dtype/layout forces one, or
+    when the source is read-only (e.g. an mmap'd cache) and could not
+    safely back a tensor that later gets written in-place.
+    """
+    arr = np.ascontiguousarray(arr, dtype=np.float32)
+    if not arr.flags.writeable:
+        arr = arr.copy()
+    return torch.from_numpy(arr)
+
+
+def maybe_compile(model: nn.Module) -> nn.Module:
+    """
+    Wrap the model with torch.compile when it can pay off (PyTorch 2+ on
+    CUDA). Inductor fuses the Linear/activation/norm chains into a few
+    kernels, which matters at batch 32 where launch overhead dominates.
+    Returns the model unchanged when compilation isn't available.
+    """
+    if not hasattr(torch, 'compile') or not torch.cuda.is_available():
+        return model
+    try:
+        return torch.compile(model, mode='reduce-overhead', fullgraph=True)
+    except Exception as e:
+        print(f"⚠️  torch.compile unavailable, using eager mode: {e}")
+        return model
+
+
+def fuse_batchnorm_for_export(module: nn.Module) -> None:
+    """
+    Fold each BatchNorm1d into an adjacent Linear layer inside an
+    nn.Sequential. Two patterns are handled:
+
+    - Linear -> BN (directly adjacent): the classic fold, BN's affine
+      map is absorbed into the preceding Linear's weights and bias.
+    - BN -> (Dropout) -> Linear: the repo's models put an activation
+      between Linear and BN, which does not commute with BN's affine
+      map, so the fold goes forward into the next Linear instead.
+      BN in eval is y = a*x + c with a = gamma/rsqrt(var+eps) and
+      c = beta - a*mean, so W@y + b becomes (W*a)@x + (W@c + b).
+
+    Both rewrites are mathematically identical and remove one op plus
+    one tensor-sized read per BN from the exported graph.
+    """
+    for child in module.children():
+        fuse_batchnorm_for_export(child)
+
+    if not isinstance(module, nn.Sequential):
+        return
+
+    layers = list(module)
+    for i, bn in enumerate(layers):
+        if not isinstance(bn, nn.BatchNorm1d):
+            continue
+
+        scale = bn.weight / torch.sqrt(bn.running_var + bn.eps)
+        shift = bn.bias - scale * bn.running_mean
+
+        if i > 0 and isinstance(layers[i - 1], nn.Linear):
+            linear = layers[i - 1]
+            with torch.no_grad():
+                linear.weight.mul_(scale.unsqueeze(1))
+                linear.bias.mul_(scale).add_(shift)
+            module[i] = nn.Identity()
+            continue
+
+        j = i + 1
+        while j < len(layers) and isinstance(layers[j], nn.Dropout):
+            j += 1
+        if j >= len(layers) or not isinstance(layers[j], nn.Linear):
+            continue
+
+        linear = layers[j]
+        with torch.no_grad():
+            linear.bias.add_(linear.weight @ shift)
+            linear.weight.mul_(scale)
+
+        module[i] = nn.Identity()
+
+
+class FastBatchNorm1d(nn.BatchNorm1d):
+    """
+    BatchNorm1d whose batch statistics come from a single pass:
+    var = E[X^2] - E[X]^2 instead of a second reduction over the batch,
+    halving the stats-step memory traffic. Parameters, buffers, and
+    state_dict layout are inherited, so checkpoints stay compatible and
+    the export-time fusion pass folds it like a regular BatchNorm1d.
+    """
+
+    def forward(self, x: torch.Tensor) -> torch.Tensor:
+        if not self.training:
+            scale = self.weight * torch.rsqrt(self.running_var + self.eps)
+            return torch.addcmul(self.bias - self.running_mean * scale, x, scale)
+
+        m = x.mean(0)
+        # Single-pass variance; clamp guards against tiny negatives from
+        # cancellation
+        v = torch.clamp(torch.mean(x * x, 0) - m * m, min=0.0)
+
+        with torch.no_grad():
+            n = x.shape[0]
+            if self.num_batches_tracked is not None:
+                self.num_batches_tracked += 1
+            momentum = (self.momentum if self.momentum is not None
+                        else 1.0 / float(self.num_batches_tracked))
+            self.running_mean.mul_(1 - momentum).add_(m.detach(), alpha=momentum)
+            # Running var stores the unbiased estimate, as stock BN does
+            unbiased = v.detach() * (n / max(n - 1, 1))
+            self.running_var.mul_(1 - momentum).add_(unbiased, alpha=momentum)
+
+        xhat = (x - m) * torch.rsqrt(v + self.eps)
+        return torch.addcmul(self.bias, xhat, self.weight)
+
+
+class DeviceBatchIterator:
+    """
+    Minimal DataLoader stand-in for tensors already resident on the
+    training device. The datasets here are a few hundred KB, so worker
+    processes, pin-memory threads, and per-batch H2D copies cost far
+    more than they save; batches are plain views/gathers on the device
+    """
+
+    def __init__(self, x: torch.Tensor, y: torch.Tensor, batch_size: int,
+                 shuffle: bool = False, drop_last: bool = True,
+                 generator: Optional[torch.Generator] = None):
+        self.x = x
+        self.y = y
+        self.batch_size = batch_size
+        self.shuffle = shuffle
+        self.generator = generator
+        n = len(x)
+        self.num_batches = n // batch_size if drop_last else -(-n // batch_size)
+
+    def __len__(self) -> int:
+        return self.num_batches
+
+    def __iter__(self):
+        if self.shuffle:
+            idx = torch.randperm(len(self.x), device=self.x.device,
+                                 generator=self.generator)
+        for i in range(self.num_batches):
+            s = i * self.batch_size
+            e = s + self.batch_size
+            if self.shuffle:
+                yield self.x[idx[s:e]], self.y[idx[s:e]]
+            else:
+                yield self.x[s:e], self.y[s:e]
+
+
 class EarlyStopping:
     """Early stopping to stop training when validation loss doesn't improve."""
     
@@ -39,22 +198,33 @@ class EarlyStopping:
     def __call__(self, score: float, model: nn.Module) -> bool:
         if self.best_score is None:
             self.best_score = score
-            self.best_state = model.state_dict().copy()
+            self.best_state = self._snapshot(model)
             return False
-            
+
         improved = self._is_improved(score)
-            
+
         if improved:
             self.best_score = score
-            self.best_state = model.state_dict().copy()
+            self.best_state = self._snapshot(model)
             self.counter = 0
         else:
             self.counter += 1
             if self.counter >= self.patience:
                 self.should_stop = True
-                
+
         return self.should_stop
-    
+
+    @staticmethod
+    def _snapshot(model: nn.Module) -> dict:
+        """
+        Snapshot weights as detached CPU clones. A plain
+        state_dict().copy() is a shallow dict copy whose values are the
+        live parameter tensors, so the "best state" would silently track
+        the current weights and the final restore would be a no-op.
+        Copying to CPU also keeps VRAM flat between improvements.
+        """
+        return {k: v.detach().to('cpu', copy=True) for k, v in model.state_dict().items()}
+
     def _is_improved(self, score: float) -> bool:
         """Check if score improved based on mode"""
         if self.best_score is None:
@@ -70,6 +240,7 @@ class ProductionTrainer:
     - Automatic GPU/CPU device selection
     - Early stopping
     - Learning rate scheduling
+    - Optional mixed-precision (AMP) training
     - Reproducibility
     - Training history logging
     """
@@ -84,9 +255,13 @@ class ProductionTrainer:
         epochs: int = 100,
         patience: int = 15,
         seed: int = 42,
-        verbose: bool = True
+        verbose: bool = True,
+        use_amp: bool = False,
+        amp_dtype: torch.dtype = torch.bfloat16,
+        deterministic: bool = False
     ):
         self.seed = seed
+        self.deterministic = deterministic
         self._set_seeds()
         
         self.rng = np.random.default_rng(seed)
@@ -98,9 +273,21 @@ class ProductionTrainer:
             if self.device.type == 'cuda':
                 print(f"   GPU: {torch.cuda.get_device_name(0)}")
         
-        self.model = model.to(self.device)
+        # Compiled on CUDA (no-op elsewhere); export_onnx unwraps _orig_mod
+        self.model = maybe_compile(model.to(self.device))
         self.criterion = criterion
-        self.optimizer = optimizer_class(model.parameters(), lr=learning_rate)
+        # Fused Adam steps every parameter in one multi-tensor kernel on
+        # CUDA; foreach is the CPU-side equivalent. Optimizer classes
+        # that don't take either knob get the plain constructor
+        try:
+            if self.device.type == 'cuda':
+                self.optimizer = optimizer_class(model.parameters(), lr=learning_rate, fused=True)
+            else:
+                self.optimizer = optimizer_class(model.parameters(), lr=learning_rate, foreach=True)
+        except TypeError:
+            self.optimizer = optimizer_class(model.parameters(), lr=learning_rate)
+        # Cached once so the per-step clip doesn't rebuild the generator
+        self._params = [p for p in model.parameters() if p.requires_grad]
         
         self.scheduler = ReduceLROnPlateau(
             self.optimizer, mode='min', factor=0.5, patience=5, min_lr=1e-6
@@ -109,17 +296,34 @@ class ProductionTrainer:
         self.early_stopping = EarlyStopping(patience=patience, mode='min')
         self.batch_size = batch_size
         self.epochs = epochs
+
+        # Mixed precision only pays off on GPU tensor cores
+        self.use_amp = use_amp and self.device.type == 'cuda'
+        self.amp_dtype = amp_dtype
+
+        # Loss scaling guards FP16 gradients against underflow; BF16 has
+        # enough exponent range and doesn't need it
+        self.scaler = torch.amp.GradScaler(
+            self.device.type, enabled=self.use_amp and amp_dtype == torch.float16
+        )
         
         self.history: dict = {'train_loss': [], 'val_loss': [], 'learning_rate': []}
+        # Populated by _finalize_training for fast in-process inference
+        self.scripted: Optional[torch.jit.ScriptModule] = None
         
     def _set_seeds(self) -> None:
-        """Set all seeds for reproducibility"""
+        """
+        Set all seeds for reproducibility. Seeding alone makes init and
+        shuffling reproducible; op-level cuDNN determinism is only forced
+        when deterministic=True, since it disables the algorithm
+        autotuner and pins slower kernels
+        """
         torch.manual_seed(self.seed)
         if torch.cuda.is_available():
             torch.cuda.manual_seed(self.seed)
             torch.cuda.manual_seed_all(self.seed)
-            torch.backends.cudnn.deterministic = True
-            torch.backends.cudnn.benchmark = False
+            torch.backends.cudnn.deterministic = self.deterministic
+            torch.backends.cudnn.benchmark = not self.deterministic
             
     def _get_device(self) -> torch.device:
         """Get best available device"""
@@ -128,36 +332,101 @@ class ProductionTrainer:
         return torch.device('cpu')
     
     def prepare_data(
-        self, 
-        features: np.ndarray, 
-        labels: np.ndarray, 
-        val_split: float = 0.2
-    ) -> Tuple[DataLoader, DataLoader]:
+        self,
+        features: np.ndarray,
+        labels: np.ndarray,
+        val_split: float = 0.2,
+        norm_params: Optional[dict] = None
+    ) -> Tuple[Iterable, Iterable]:
         """Prepare train and validation data loaders"""
-        indices = self.rng.permutation(len(features))
-        features = features[indices]
-        labels = labels[indices]
-        
         split_idx = int(len(features) * (1 - val_split))
-        x_train, x_val = features[:split_idx], features[split_idx:]
-        y_train, y_val = labels[:split_idx], labels[split_idx:]
-        
-        train_ds = TensorDataset(torch.FloatTensor(x_train), torch.FloatTensor(y_train))
-        val_ds = TensorDataset(torch.FloatTensor(x_val), torch.FloatTensor(y_val))
-        
-        num_workers = get_num_workers()
-        train_loader = DataLoader(train_ds, batch_size=self.batch_size, shuffle=True, num_workers=num_workers)
-        val_loader = DataLoader(val_ds, batch_size=self.batch_size, num_workers=num_workers)
-        
+        self._shuffle_gen: Optional[torch.Generator] = None
+
+        if self.device.type == 'cuda' and features.nbytes <= _PRELOAD_BYTES_LIMIT:
+            # Upload once, then split with a device-side permutation: one
+            # gather on GPU instead of a host-side fancy-index copy of
+            # the whole dataset before the upload
+            x = as_float_tensor(features).to(self.device)
+            y = as_float_tensor(labels).to(self.device)
+            gen = torch.Generator(device=self.device)
+            gen.manual_seed(self.seed)
+            self._shuffle_gen = gen
+            perm = torch.randperm(len(features), device=self.device, generator=gen)
+            train_x, val_x = x[perm[:split_idx]], x[perm[split_idx:]]
+            train_y, val_y = y[perm[:split_idx]], y[perm[split_idx:]]
+        else:
+            indices = self.rng.permutation(len(features))
+            # Fancy indexing yields fresh writable copies, so the tensors
+            # below share their memory without another copy
+            features = features[indices]
+            labels = labels[indices]
+            train_x, val_x = as_float_tensor(features[:split_idx]), as_float_tensor(features[split_idx:])
+            train_y, val_y = as_float_tensor(labels[:split_idx]), as_float_tensor(labels[split_idx:])
+
+        # 1-D labels become (N, 1) views once here so regression losses
+        # see shapes matching the model output instead of squeezing it
+        # every batch; multi-output labels are already 2-D
+        if train_y.dim() == 1:
+            train_y = train_y.unsqueeze(1)
+            val_y = val_y.unsqueeze(1)
+
+        if norm_params is not None:
+            # Normalize in-place on the training device: one fused
+            # read-modify-write instead of two NumPy passes with an
+            # N x F temporary each
+            mean = torch.tensor(norm_params['means'], dtype=torch.float32, device=train_x.device)
+            std = torch.tensor(norm_params['stds'], dtype=torch.float32, device=train_x.device)
+            train_x.sub_(mean).div_(std)
+            val_x.sub_(mean).div_(std)
+
+        # drop_last keeps *training* batch shapes fixed so torch.compile's
+        # reduce-overhead CUDA graphs don't recompile on the tail batch.
+        # Validation runs under no_grad with no compiled-shape concern and
+        # its split can be smaller than one batch, so it keeps the tail.
+        # On GPU the whole dataset lives on the device and batches are
+        # sliced/gathered there — no workers, no per-batch H2D copies
+        if train_x.is_cuda:
+            train_loader = DeviceBatchIterator(train_x, train_y, self.batch_size,
+                                               shuffle=True, drop_last=True,
+                                               generator=self._shuffle_gen)
+            val_loader = DeviceBatchIterator(val_x, val_y, self.batch_size, drop_last=False)
+            return train_loader, val_loader
+
+        train_ds = TensorDataset(train_x, train_y)
+        val_ds = TensorDataset(val_x, val_y)
+
+        # Small in-memory datasets are served faster from the main
+        # process than over worker IPC; when workers are used, keep them
+        # alive across epochs instead of re-forking every iteration.
+        # Pinned host memory lets the per-batch H2D copies run async and
+        # overlap the previous batch's kernels (datasets too big to
+        # preload land here on CUDA)
+        num_workers = 0 if len(train_ds) < 1_000_000 else get_num_workers()
+        persistent = num_workers > 0
+        pin = self.device.type == 'cuda'
+        train_loader = DataLoader(train_ds, batch_size=self.batch_size, shuffle=True,
+                                  num_workers=num_workers, persistent_workers=persistent,
+                                  pin_memory=pin, drop_last=True)
+        val_loader = DataLoader(val_ds, batch_size=self.batch_size,
+                                num_workers=num_workers, persistent_workers=persistent,
+                                pin_memory=pin, drop_last=False)
+
         return train_loader, val_loader
     
     def train(
         self, 
-        train_loader: DataLoader, 
-        val_loader: DataLoader,
+        train_loader: Iterable,
+        val_loader: Iterable,
         is_classification: bool = False
     ) -> nn.Module:
         """Main training loop with all production features"""
+        # Fail loudly instead of dividing epoch losses by zero batches
+        if len(train_loader) == 0 or len(val_loader) == 0:
+            raise ValueError(
+                f"Dataset too small for batch_size={self.batch_size}: "
+                f"{len(train_loader)} train / {len(val_loader)} val batches"
+            )
+
         self._log_training_start()
         
         for epoch in range(self.epochs):
@@ -178,72 +447,118 @@ class ProductionTrainer:
             print(f"Starting training: {self.epochs} max epochs, patience={self.early_stopping.patience}")
             print(f"{'='*50}\n")
     
-    def _train_epoch(self, train_loader: DataLoader, is_classification: bool) -> float:
+    def _train_epoch(self, train_loader: Iterable, is_classification: bool) -> torch.Tensor:
         """Run one training epoch"""
         self.model.train()
-        total_loss = 0.0
-        
+        # Accumulate on-device; a .item() per batch would force a CUDA
+        # sync per step
+        total_loss = torch.zeros((), device=self.device)
+
         for batch_x, batch_y in train_loader:
-            batch_x, batch_y = batch_x.to(self.device), batch_y.to(self.device)
-            
-            self.optimizer.zero_grad()
-            outputs = self.model(batch_x)
-            
-            loss = self._compute_loss(outputs, batch_y, is_classification)
-            loss.backward()
-            
-            torch.nn.utils.clip_grad_norm_(self.model.parameters(), max_norm=1.0)
-            self.optimizer.step()
-            total_loss += loss.item()
-        
+            batch_x = batch_x.to(self.device, non_blocking=True)
+            batch_y = batch_y.to(self.device, non_blocking=True)
+
+            self.optimizer.zero_grad(set_to_none=True)
+            with torch.autocast(device_type=self.device.type, dtype=self.amp_dtype, enabled=self.use_amp):
+                outputs = self.model(batch_x)
+                loss = self._compute_loss(outputs, batch_y, is_classification)
+            self.scaler.scale(loss).backward()
+
+            # Clip on unscaled gradients (unscale_ is a no-op when the
+            # scaler is disabled); foreach batches all per-tensor norms
+            # into one multi-tensor kernel launch
+            self.scaler.unscale_(self.optimizer)
+            torch.nn.utils.clip_grad_norm_(self._params, max_norm=1.0, foreach=True)
+            self.scaler.step(self.optimizer)
+            self.scaler.update()
+            total_loss += loss.detach()
+
+        # Stays a 0-d device tensor; the host only reads it at print
+        # cadence and when history is finalized, so quiet epochs run
+        # without a train-side device->host sync
         return total_loss / len(train_loader)
-    
-    def _validate_epoch(self, val_loader: DataLoader, is_classification: bool) -> float:
+
+    def _validate_epoch(self, val_loader: Iterable, is_classification: bool) -> float:
         """Run one validation epoch"""
         self.model.eval()
-        total_loss = 0.0
-        
+        total_loss = torch.zeros((), device=self.device)
+
         with torch.no_grad():
             for batch_x, batch_y in val_loader:
-                batch_x, batch_y = batch_x.to(self.device), batch_y.to(self.device)
-                outputs = self.model(batch_x)
-                loss = self._compute_loss(outputs, batch_y, is_classification)
-                total_loss += loss.item()
-        
-        return total_loss / len(val_loader)
+                batch_x = batch_x.to(self.device, non_blocking=True)
+                batch_y = batch_y.to(self.device, non_blocking=True)
+                with torch.autocast(device_type=self.device.type, dtype=self.amp_dtype, enabled=self.use_amp):
+                    outputs = self.model(batch_x)
+                    loss = self._compute_loss(outputs, batch_y, is_classification)
+                total_loss += loss.detach()
+
+        return (total_loss / len(val_loader)).item()
     
     def _compute_loss(self, outputs: torch.Tensor, targets: torch.Tensor, is_classification: bool) -> torch.Tensor:
-        """Compute loss based on task type"""
+        """Compute loss based on task type; targets arrive 2-D from prepare_data"""
         if is_classification:
-            return self.criterion(outputs, targets.long())
-        return self.criterion(outputs.squeeze(), targets)
+            return self.criterion(outputs, targets[:, 0].long())
+        return self.criterion(outputs, targets)
     
-    def _update_training_state(self, epoch: int, train_loss: float, val_loss: float) -> bool:
+    def _update_training_state(self, epoch: int, train_loss: torch.Tensor, val_loss: float) -> bool:
         """Update history, scheduler, and check early stopping"""
         current_lr = self.optimizer.param_groups[0]['lr']
+        # train_loss is kept as a device tensor until finalize; val_loss
+        # must be a host float anyway for the plateau scheduler and the
+        # early-stopping comparison, so that is the one sync per epoch
         self.history['train_loss'].append(train_loss)
         self.history['val_loss'].append(val_loss)
         self.history['learning_rate'].append(current_lr)
-        
+
         self.scheduler.step(val_loss)
-        
+
         if self.early_stopping(val_loss, self.model):
             if self.verbose:
                 print(f"\n⏹️  Early stopping at epoch {epoch+1}")
             return True
-        
+
         if self.verbose and (epoch + 1) % 10 == 0:
-            print(f"Epoch {epoch+1:3d}/{self.epochs} | Train: {train_loss:.4f} | Val: {val_loss:.4f} | LR: {current_lr:.2e}")
-        
+            print(f"Epoch {epoch+1:3d}/{self.epochs} | Train: {float(train_loss):.4f} | Val: {val_loss:.4f} | LR: {current_lr:.2e}")
+
         return False
-    
+
     def _finalize_training(self) -> None:
         """Load best model and log completion"""
+        # One sync at the end materializes the per-epoch train losses
+        # for history/metadata consumers
+        self.history['train_loss'] = [float(t) for t in self.history['train_loss']]
+
         if self.early_stopping.best_state:
             self.model.load_state_dict(self.early_stopping.best_state)
-            
+
+        self.model.eval()
+        self.scripted = self._build_scripted()
+
         if self.verbose and self.early_stopping.best_score is not None:
             print(f"\n✅ Training complete. Best val loss: {self.early_stopping.best_score:.4f}")
+
+    def _build_scripted(self) -> Optional[torch.jit.ScriptModule]:
+        """
+        Scripted + frozen copy of the trained model for repeated in-process
+        inference. Freezing inlines parameters and norm constants and runs
+        graph-level peepholes, removing per-op Python dispatch — which
+        dominates at batch 1 on a ~12-op network. The ONNX export path is
+        unaffected; this is for callers that keep using the trainer.
+        """
+        base = getattr(self.model, '_orig_mod', self.model)
+        try:
+            scripted = torch.jit.freeze(torch.jit.script(base).eval())
+            # Prime the profiling executor so the first real call doesn't
+            # pay the optimization warmup
+            in_features = next(m.in_features for m in base.modules() if isinstance(m, nn.Linear))
+            with torch.no_grad():
+                for _ in range(2):
+                    scripted(torch.zeros(1, in_features, device=self.device))
+            return scripted
+        except Exception as e:
+            if self.verbose:
+                print(f"⚠️  torch.jit scripting skipped: {e}")
+            return None
     
     def export_onnx(
         self, 
@@ -255,22 +570,104 @@ class ProductionTrainer:
         """Export model to ONNX format with metadata"""
         self.model.eval()
         self.model.cpu()
-        
+
+        # Unwrap a torch.compile wrapper if present, then fuse BN into
+        # adjacent Linears on a copy so the trained model keeps its
+        # original structure
+        export_model = copy.deepcopy(getattr(self.model, '_orig_mod', self.model))
+        fuse_batchnorm_for_export(export_model)
+
         dummy_input = torch.randn(1, input_size)
-        
+
         torch.onnx.export(
-            self.model,
+            export_model,
             dummy_input,
             output_path,
             input_names=['input'],
             output_names=['output'],
             dynamic_axes={'input': {0: 'batch_size'}, 'output': {0: 'batch_size'}},
             opset_version=17,
+            do_constant_folding=True,
             dynamo=False  # Use legacy export, not TorchDynamo
         )
         
         self._save_metadata(output_path, model_name, norm_params, input_size)
-    
+        self._annotate_shapes(output_path)
+        self._export_static_bs1(output_path, export_model, input_size)
+        self._export_quantized(output_path)
+        self._export_fp16(output_path)
+
+    def _annotate_shapes(self, output_path: str) -> None:
+        """Run ONNX shape inference so every intermediate tensor carries
+        shape info — graph optimizers fold more with it present"""
+        try:
+            import onnx
+        except ImportError:
+            return
+
+        try:
+            onnx.save(onnx.shape_inference.infer_shapes(onnx.load(output_path)), output_path)
+        except Exception as e:
+            print(f"⚠️  Shape inference skipped: {e}")
+
+    def _export_static_bs1(self, output_path: str, export_model: nn.Module, input_size: int) -> None:
+        """
+        Write a fixed-batch-1 sibling model for low-latency single-request
+        inference. Without the dynamic batch axis, onnxruntime's
+        ORT_ENABLE_ALL level (which the explain service already sets) can
+        constant-fold and fuse the MatMul+Add chains that a symbolic
+        batch dimension blocks.
+        """
+        bs1_path = output_path.replace('.onnx', '.bs1.onnx')
+        try:
+            torch.onnx.export(
+                export_model,
+                torch.randn(1, input_size),
+                bs1_path,
+                input_names=['input'],
+                output_names=['output'],
+                opset_version=17,
+                do_constant_folding=True,
+                dynamo=False
+            )
+            self._annotate_shapes(bs1_path)
+            print(f"📦 Static batch-1 model exported: {bs1_path}")
+        except Exception as e:
+            print(f"⚠️  Static batch-1 export skipped: {e}")
+
+    def _export_quantized(self, output_path: str) -> None:
+        """Write an INT8 dynamically-quantized sibling model for CPU inference"""
+        try:
+            from onnxruntime.quantization import quantize_dynamic, QuantType
+        except ImportError:
+            return
+
+        int8_path = output_path.replace('.onnx', '.int8.onnx')
+        try:
+            quantize_dynamic(output_path, int8_path, weight_type=QuantType.QInt8)
+            print(f"📦 INT8 model exported: {int8_path}")
+        except Exception as e:
+            print(f"⚠️  INT8 quantization skipped: {e}")
+
+    def _export_fp16(self, output_path: str) -> None:
+        """Write an FP16 sibling model for GPU execution providers"""
+        try:
+            import onnx
+            from onnxconverter_common import float16
+        except ImportError:
+            return
+
+        fp16_path = output_path.replace('.onnx', '.fp16.onnx')
+        try:
+            model_fp32 = onnx.load(output_path)
+            # keep_io_types leaves inputs/outputs as float32 so callers
+            # don't need to cast
+            model_fp16 = float16.convert_float_to_float16(model_fp32, keep_io_types=True)
+            onnx.save(model_fp16, fp16_path)
+            print(f"📦 FP16 model exported: {fp16_path}")
+        except Exception as e:
+            print(f"⚠️  FP16 conversion skipped: {e}")
+
     def _save_metadata(self, output_path: str, model_name: str, norm_params: dict, input_size: int) -> None:
         """Save model metadata to JSON"""
         metadata_path = output_path.replace('.onnx', '_metadata.json')